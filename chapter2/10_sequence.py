@@ -57,4 +57,341 @@ print(s1[-1]) # 2019-01-04
 """
 이터러블과 시퀀스 중 어느 것을 사용할지 결정할때 메모리와 CPU 사이의 트레이드오프 계산을 하면 좋다.
 일반적으로 이터레이션 그 중 제너레이터 방식이 바람직하지만 모든 경우의 요건을 염두해 둬야 한다.
-"""
\ No newline at end of file
+"""
+"""
+하지만 위 DateRangeSequence는 생성 시점에 모든 날짜를 리스트로 만들어 두기 때문에
+기간이 수십 년이 되면 생성에만 수 초가 걸리고 인스턴스마다 수십 MB의 메모리를 차지한다.
+
+날짜는 date.toordinal()로 정수(서수)로 바꿀 수 있으므로
+n번째 날짜는 "시작 날짜의 서수 + n"으로 바로 계산할 수 있다.
+내장 range 객체도 같은 방식으로 동작한다.
+range는 모든 정수를 보관하지 않고 start, stop, step만 가지고 있으면서
+인덱싱, 음수 인덱스, 슬라이스, in, index(), len()을 모두 O(1)로 지원한다.
+
+즉 날짜 서수의 range를 감싸기만 하면 메모리 사용량은 기간과 상관없이 일정하고
+인덱싱도 O(1)인 시퀀스를 만들 수 있다.
+슬라이스의 결과 역시 range이므로 같은 타입의 지연 시퀀스로 다시 감싸서 반환한다.
+(범위로 인덱싱한 결과는 원본 객체와 같은 타입이어야 한다는 규칙)
+"""
+
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # datetime64의 기준일
+
+
+def _to_date(ordinal):
+    """ 빈 범위나 역방향 슬라이스의 경계값이 date의 범위를 벗어나지 않도록 보정 """
+    return date.fromordinal(min(max(ordinal, 1), date.max.toordinal()))
+
+
+class LazyDateRangeSequence:
+    """ 날짜를 미리 만들지 않고 시작 날짜와 오프셋으로 계산하는 시퀀스 """
+
+    def __init__(self, start_date, end_date, step=1):
+        self.start_date = start_date
+        self.end_date = end_date
+        self._days = range(start_date.toordinal(), end_date.toordinal(), step)
+
+    @classmethod
+    def _from_days(cls, days):
+        sequence = cls.__new__(cls)
+        sequence.start_date = _to_date(days.start)
+        sequence.end_date = _to_date(days.stop)
+        sequence._days = days
+        return sequence
+
+    @property
+    def step(self):
+        return self._days.step
+
+    def __getitem__(self, day_no):
+        if isinstance(day_no, slice):
+            return self._from_days(self._days[day_no])
+        return date.fromordinal(self._days[day_no])
+
+    def __len__(self):
+        return len(self._days)
+
+    def __iter__(self):
+        return map(date.fromordinal, self._days)
+
+    def __contains__(self, day):
+        return isinstance(day, date) and day.toordinal() in self._days
+
+    def index(self, day):
+        if day not in self:
+            raise ValueError(f"{day}는 {self!r}에 없음")
+        return self._days.index(day.toordinal())
+
+    def to_array(self):
+        if np is None:
+            return array("i", self._days)
+        days = self._days
+        return (
+            np.arange(days.start, days.stop, days.step) - EPOCH_ORDINAL
+        ).astype("datetime64[D]")
+
+    def chunks(self, size):
+        for start in range(0, len(self), size):
+            yield self[start:start + size].to_array()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}"
+            f"({self.start_date!r}, {self.end_date!r}, step={self.step})"
+        )
+
+s2 = LazyDateRangeSequence(date(2019, 1, 1), date(2019, 1, 5))
+print(", ".join(map(str, s2))) # 2019-01-01, 2019-01-02, 2019-01-03, 2019-01-04
+print(s2[0]) # 2019-01-01
+print(s2[-1]) # 2019-01-04
+print(list(s2[1:3])) # [datetime.date(2019, 1, 2), datetime.date(2019, 1, 3)]
+print(s2[::2]) # LazyDateRangeSequence(datetime.date(2019, 1, 1), datetime.date(2019, 1, 5), step=2)
+print(date(2019, 1, 3) in s2) # True
+print(s2.index(date(2019, 1, 3))) # 2
+print(len(s2)) # 4
+
+"""
+리스트 기반 시퀀스와 비교
+100년 기간의 시퀀스를 만들고 마지막 날짜를 조회하는 시간과 인스턴스가 차지하는 메모리를 측정해보면
+리스트 기반은 기간에 비례해서 늘어나지만 지연 시퀀스는 기간과 상관없이 일정하다.
+"""
+import sys
+import timeit
+
+century = (date(1920, 1, 1), date(2020, 1, 1))
+print(timeit.timeit(lambda: DateRangeSequence(*century)[-1], number=10))
+# 약 0.3초 (환경에 따라 다름)
+print(timeit.timeit(lambda: LazyDateRangeSequence(*century)[-1], number=10))
+# 약 0.00003초
+print(sys.getsizeof(DateRangeSequence(*century)._range)) # 약 300KB (date 객체 36525개는 별도)
+print(sys.getsizeof(LazyDateRangeSequence(*century)._days)) # 48
+
+"""
+날짜를 하나씩 date 객체로 만들지 않고 범위 전체를 한 번에 내보낼 수도 있다.
+내부가 서수의 range이므로 NumPy가 있으면 np.arange 한 번으로 datetime64[D] 배열을,
+없으면 array('i')에 서수를 그대로 담아 반환한다.
+chunks(n)는 지연 슬라이스를 n개씩 배열로 바꾸므로 긴 범위도 일정한 메모리로 처리할 수 있다.
+"""
+print(s2.to_array())
+# NumPy: ['2019-01-01' '2019-01-02' '2019-01-03' '2019-01-04']
+# array('i', [737060, 737061, 737062, 737063])
+print([len(chunk) for chunk in LazyDateRangeSequence(*century).chunks(10000)]) # [10000, 10000, 10000, 6525]
+
+"""
+날짜 범위가 수십만 개가 되면 "X일을 포함하는 범위는 어떤 것인가?"를 알기 위해
+모든 시퀀스에 대해 day in sequence를 확인하는 선형 탐색을 해야 한다.
+
+이를 위해 범위들을 시작 날짜 순으로 정렬된 균형 이진 트리(트립, treap)에 보관하는 인덱스를 만든다.
+각 노드는 자신의 서브트리에 있는 범위 중 가장 늦은 종료일(max_end)을 함께 기억하는데,
+이를 이용하면 찾는 날짜보다 먼저 끝나는 서브트리 전체를 건너뛸 수 있다. (interval tree)
+
+- add(), remove(): 기대 시간복잡도 O(log n)의 점진적 삽입, 삭제
+- covering(day): 날짜를 포함하는 범위들, O(log n + k)에 가깝게 탐색
+- union(): 겹치거나 이어지는 범위를 합친 결과
+- intersection(other): 두 인덱스가 모두 포함하는 날짜 범위
+- gaps(): 합친 범위 사이의 빈 기간
+
+범위는 start_date, end_date를 가진 객체(DateRangeSequence, LazyDateRangeSequence 등)이며
+step과 상관없이 start_date부터 end_date 전날까지의 연속된 기간으로 취급한다.
+seq[::-1]처럼 거꾸로 진행하는 범위는 같은 날짜들을 순서대로 진행하는 기간으로 바꿔서 저장하고, 빈 범위는 추가할 수 없다.
+"""
+import random
+
+
+class _Node:
+    __slots__ = ("key", "date_range", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, date_range):
+        self.key = key
+        self.date_range = date_range
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = key[1]
+
+    def update(self):
+        self.max_end = max(
+            self.key[1],
+            self.left.max_end if self.left else self.key[1],
+            self.right.max_end if self.right else self.key[1],
+        )
+        return self
+
+
+def _split(node, key):
+    """ key보다 작은 노드들과 크거나 같은 노드들로 트리를 나눔 """
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return node.update(), right
+    left, node.left = _split(node.left, key)
+    return left, node.update()
+
+
+def _merge(left, right):
+    """ left의 모든 키가 right의 키보다 작은 두 트리를 합침 """
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return left.update()
+    right.left = _merge(left, right.left)
+    return right.update()
+
+
+class DateRangeIndex:
+    """ 여러 날짜 범위에 대한 포함, 합집합, 교집합, 빈 기간 질의 """
+
+    def __init__(self, date_ranges=()):
+        self._root = None
+        self._size = 0
+        for date_range in date_ranges:
+            self.add(date_range)
+
+    @staticmethod
+    def _key(date_range):
+        """ (첫날 서수, 마지막 날 다음 날 서수, id), 빈 범위는 ValueError """
+        if not date_range:
+            raise ValueError(f"{date_range!r}는 빈 범위")
+        start = date_range.start_date.toordinal()
+        end = date_range.end_date.toordinal()
+        if start > end:
+            # seq[::-1] 같은 역방향 범위는 start_date부터 end_date 다음 날까지 거꾸로 진행
+            start, end = end + 1, start + 1
+        return start, end, id(date_range)
+
+    def add(self, date_range):
+        key = self._key(date_range)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key, date_range)), right)
+        self._size += 1
+
+    def remove(self, date_range):
+        key = self._key(date_range)
+        left, right = _split(self._root, key)
+        found, right = _split(right, key[:2] + (key[2] + 1,))
+        self._root = _merge(left, right)
+        if found is None:
+            raise ValueError(f"{date_range!r}는 인덱스에 없음")
+        self._size -= 1
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        stack, node = [], self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.date_range
+            node = node.right
+
+    def covering(self, day):
+        ordinal = day.toordinal()
+        found, stack = [], [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= ordinal:
+                continue
+            stack.append(node.left)
+            if node.key[0] <= ordinal:
+                if ordinal < node.key[1]:
+                    found.append(node.date_range)
+                stack.append(node.right)
+        return found
+
+    def __contains__(self, day):
+        return bool(self.covering(day))
+
+    def _merged(self):
+        """ 겹치거나 맞닿은 범위를 합친 (시작 서수, 종료 서수) 목록 """
+        merged = []
+        for date_range in self:
+            start, end, _ = self._key(date_range)
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    @staticmethod
+    def _to_ranges(pairs):
+        return [
+            LazyDateRangeSequence(date.fromordinal(start), date.fromordinal(end))
+            for start, end in pairs
+        ]
+
+    def union(self):
+        return self._to_ranges(self._merged())
+
+    def intersection(self, other):
+        mine, theirs = self._merged(), other._merged()
+        common, i, j = [], 0, 0
+        while i < len(mine) and j < len(theirs):
+            start = max(mine[i][0], theirs[j][0])
+            end = min(mine[i][1], theirs[j][1])
+            if start < end:
+                common.append((start, end))
+            if mine[i][1] < theirs[j][1]:
+                i += 1
+            else:
+                j += 1
+        return self._to_ranges(common)
+
+    def gaps(self):
+        merged = self._merged()
+        return self._to_ranges(
+            (previous[1], following[0])
+            for previous, following in zip(merged, merged[1:])
+        )
+
+january = LazyDateRangeSequence(date(2019, 1, 1), date(2019, 2, 1))
+first_week = LazyDateRangeSequence(date(2019, 1, 1), date(2019, 1, 8))
+march = LazyDateRangeSequence(date(2019, 3, 1), date(2019, 4, 1))
+index = DateRangeIndex([january, first_week, march])
+
+print(len(index.covering(date(2019, 1, 3)))) # 2
+print(index.covering(date(2019, 1, 20)) == [january]) # True
+print(date(2019, 2, 15) in index) # False
+print(index.union())
+# [LazyDateRangeSequence(datetime.date(2019, 1, 1), datetime.date(2019, 2, 1), step=1),
+#  LazyDateRangeSequence(datetime.date(2019, 3, 1), datetime.date(2019, 4, 1), step=1)]
+print(index.gaps())
+# [LazyDateRangeSequence(datetime.date(2019, 2, 1), datetime.date(2019, 3, 1), step=1)]
+print(index.intersection(DateRangeIndex([LazyDateRangeSequence(date(2019, 1, 20), date(2019, 3, 10))])))
+# [LazyDateRangeSequence(datetime.date(2019, 1, 20), datetime.date(2019, 2, 1), step=1),
+#  LazyDateRangeSequence(datetime.date(2019, 3, 1), datetime.date(2019, 3, 10), step=1)]
+
+index.remove(january)
+print(len(index.covering(date(2019, 1, 3)))) # 1
+
+backwards = DateRangeIndex([LazyDateRangeSequence(date(2019, 1, 1), date(2019, 3, 1))[::-1]])
+print(len(backwards.covering(date(2019, 2, 10)))) # 1
+print(backwards.union())
+# [LazyDateRangeSequence(datetime.date(2019, 1, 1), datetime.date(2019, 3, 1), step=1)]
+
+"""
+선형 탐색과 비교
+10만 개의 짧은 범위 중에서 특정 날짜를 포함하는 범위를 찾는 시간을 비교해보면
+선형 탐색은 범위의 개수에 비례하지만 인덱스는 트리의 높이만큼만 내려간다.
+"""
+ranges = [
+    LazyDateRangeSequence(date(2000, 1, 1) + timedelta(days=n), date(2000, 1, 1) + timedelta(days=n + 7))
+    for n in range(100000)
+]
+ranges_index = DateRangeIndex(ranges)
+target = date(2100, 1, 1)
+print(timeit.timeit(lambda: [r for r in ranges if target in r], number=10))
+# 약 0.2초
+print(timeit.timeit(lambda: ranges_index.covering(target), number=10))
+# 약 0.0001초
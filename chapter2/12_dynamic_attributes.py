@@ -42,4 +42,80 @@ __getattr__에서 값을 검색할 수 없는 경우 AttributeError 예외가 
 이 예외가 없으면 기본 값을 반환한다고 한다.
 
 그렇기에 __getattr__ 같은 동적인 메소드를 구현할때는 AttributeError를 발생시켜야 한다.
-"""
\ No newline at end of file
+"""
+"""
+__getattr__는 없는 속성에 접근할 때마다 호출되므로
+위 예제는 fallback_ 속성에 접근할 때마다 startswith 검사, str.replace, f-string 생성을 반복한다.
+설정 객체처럼 반복문 안에서 자주 접근하는 경우 이 비용이 쌓이게 된다.
+
+fallback 값은 속성의 이름만으로 결정되므로 이름별로 결과를 기억(memoize)해 둘 수 있다.
+functools.lru_cache를 사용하면
+- maxsize로 크기가 제한되어 임의의 속성 이름이 계속 들어와도 캐시가 무한히 커지지 않고
+- cache_clear()로 명시적으로 무효화할 수 있으며
+- cache_info()로 적중률을 확인할 수 있다.
+
+추가로 install=True로 생성하면 계산한 값을 인스턴스의 __dict__에 실제 속성으로 설치한다.
+다음부터는 일반 속성 조회로 찾아지므로 __getattr__ 자체가 호출되지 않는다.
+(앞에서 본 dyn.__dict__["fallback_new"]와 같은 원리)
+설치하는 속성의 개수도 install_limit으로 제한하고, invalidate()로 설치한 속성을 제거할 수 있다.
+"""
+from functools import lru_cache
+
+
+class CachedDynamicAttributes(DynamicAttributes):
+    """ fallback 속성 값을 이름별로 캐시하는 DynamicAttributes """
+
+    def __init__(self, attribute, install=False, install_limit=64) -> None:
+        super().__init__(attribute)
+        self._install = install
+        self._install_limit = install_limit
+        self._installed = set()
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _resolve(attr):
+        if attr.startswith("fallback_"):
+            name = attr.replace("fallback_", "")
+            return f"[fallback resolved] {name}"
+        return None
+
+    def __getattr__(self, attr):
+        value = self._resolve(attr)
+        if value is None:
+            raise AttributeError(f"{self.__class__.__name__}에는 {attr} 속성이 없음.")
+        if self._install and len(self._installed) < self._install_limit:
+            self.__dict__[attr] = value
+            self._installed.add(attr)
+        return value
+
+    def invalidate(self, *attrs):
+        """ 설치한 속성(지정하지 않으면 전부)을 제거하고 이름별 캐시를 비움 """
+        for attr in attrs or tuple(self._installed):
+            if attr in self._installed:
+                self._installed.discard(attr)
+                self.__dict__.pop(attr, None)
+        self._resolve.cache_clear()
+
+cached = CachedDynamicAttributes("value")
+print(cached.fallback_test) # [fallback resolved] test
+print(cached.fallback_test) # [fallback resolved] test
+print(CachedDynamicAttributes._resolve.cache_info())
+# CacheInfo(hits=1, misses=1, maxsize=256, currsize=1)
+
+installed = CachedDynamicAttributes("value", install=True)
+print(installed.fallback_test) # [fallback resolved] test
+print("fallback_test" in installed.__dict__) # True
+installed.invalidate()
+print("fallback_test" in installed.__dict__) # False
+print(getattr(installed, "something", "default")) # default
+
+"""
+반복 접근 시간을 비교해보면 캐시만 사용한 경우에는 문자열 처리 비용만 사라질 뿐
+일반 속성 조회가 실패한 뒤 __getattr__로 넘어오는 비용이 대부분이라 차이가 크지 않다.
+속성을 설치한 경우에는 __getattr__ 호출 자체가 없어져서 일반 속성 접근과 같은 속도가 된다.
+"""
+import timeit
+
+print(timeit.timeit(lambda: dyn.fallback_test, number=100000)) # 약 0.14초
+print(timeit.timeit(lambda: cached.fallback_test, number=100000)) # 약 0.11초
+print(timeit.timeit(lambda: installed.fallback_test, number=100000)) # 약 0.009초
@@ -33,3 +33,90 @@ print(items.__getitem__(1)) # 2
 - 범위로 인덱싱하는 결과는 해당 클래스와 같은 타입의 인스턴스여야 한다.(원본 객체와 동일한 타입)
 - slice에 의해 제공된 범위는 파이썬이 하는 것처럼 마지막 요소는 제외해야 한다.(일관성에 관한 것)
 """
+
+"""
+Items는 값을 파이썬 리스트에 복사하고, 슬라이스할 때마다 새로운 리스트를 만든다.
+숫자 데이터를 대량으로 담는 경우에는 값마다 파이썬 객체가 생기고 슬라이스마다 복사가 일어나므로
+메모리를 두 배로 사용하게 된다.
+
+같은 타입의 숫자만 담는다면 표준 라이브러리의 array.array를 사용해 연속된 메모리에 값을 저장하고,
+슬라이스는 memoryview로 같은 버퍼를 가리키는 뷰를 만들어 복사 없이 반환할 수 있다.
+슬라이스 결과는 원본 객체와 같은 타입(TypedItems)이어야 한다는 규칙도 그대로 지킨다.
+__len__, __getitem__은 Items와 동일하게 동작하므로 기존 호출자는 그대로 사용할 수 있다.
+"""
+from array import array
+
+
+class TypedItems:
+    """ array.array에 값을 저장하고 슬라이스는 복사 없이 뷰로 반환하는 Items """
+
+    def __init__(self, typecode, *values):
+        self._values = array(typecode, values)
+
+    @classmethod
+    def _from_view(cls, view):
+        items = cls.__new__(cls)
+        items._values = view
+        return items
+
+    @property
+    def typecode(self):
+        if isinstance(self._values, memoryview):
+            return self._values.format
+        return self._values.typecode
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._from_view(memoryview(self._values)[item])
+        return self._values[item]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def extend(self, values):
+        """ 같은 타입의 버퍼(array, bytes, memoryview 등)는 바이트 단위로 한 번에 복사 """
+        if isinstance(self._values, memoryview):
+            raise TypeError("슬라이스 뷰는 확장할 수 없음")
+        try:
+            buffer = memoryview(values)
+        except TypeError:
+            self._resize("extend", values)
+            return
+        if buffer.format != self.typecode:
+            raise TypeError(f"{buffer.format} 타입의 버퍼를 {self.typecode} 타입에 추가할 수 없음")
+        if not buffer.c_contiguous:
+            self._resize("extend", buffer)
+            return
+        self._resize("frombytes", buffer.cast("B"))
+
+    def _resize(self, method, values):
+        try:
+            getattr(self._values, method)(values)
+        except BufferError:
+            # 슬라이스 뷰가 버퍼를 참조하는 동안에는 크기를 바꿀 수 없으므로 복사본에 추가
+            self._values = array(self._values.typecode, self._values)
+            getattr(self._values, method)(values)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.typecode!r}, {list(self._values)})"
+
+typed = TypedItems("d", 1.0, 2.0, 3.0)
+print(len(typed)) # 3
+print(typed[1]) # 2.0
+print(typed[1:]) # TypedItems('d', [2.0, 3.0])
+
+typed.extend(array("d", [4.0, 5.0]))
+print(typed[::2]) # TypedItems('d', [1.0, 3.0, 5.0])
+print(typed[::2].typecode) # d
+
+"""
+typed[1:]는 원본 버퍼를 그대로 가리키는 memoryview이므로 값을 복사하지 않는다.
+뷰가 살아있는 동안 원본을 extend 하면 array는 버퍼 크기를 바꿀 수 없기 때문에 BufferError가 발생하는데,
+이 경우에는 원본만 새로운 버퍼로 복사한 뒤 추가하고 기존 뷰는 이전 값을 계속 가리킨다.
+"""
+tail = typed[3:]
+typed.extend([6.0])
+print(tail, typed[-1]) # TypedItems('d', [4.0, 5.0]) 6.0
@@ -7,6 +7,12 @@ __enter__ 와 __exit__ 매직 메서드를 구현하면 컨텍스트 관리자 
 """
 import contextlib
 
+executed = []
+
+def run(command):
+    """ 예제에서는 명령을 실제로 실행하지 않고 기록만 함 """
+    executed.append(command)
+
 def stop_database():
     run("systemctl stop postgresql.service")
 
@@ -54,7 +60,7 @@ class dbhandler_decorator(contextlib.ContextDecorator):
     def __exit__(self, ext_type, ex_value, ex_traceback):
         start_database()
 
-@dbhandler_decorator
+@dbhandler_decorator()
 def offline_backup():
     run("pg_dump database")
 
@@ -86,6 +92,14 @@ def offline_backup():
 
 import contextlib
 
+class DataConversionException(Exception):
+    pass
+
+def parse_data(data):
+    raise DataConversionException(f"변환할 수 없는 데이터: {data!r}")
+
+input_json_or_dict = {}
+
 with contextlib.suppress(DataConversionException):
     parse_data(input_json_or_dict)
 
@@ -96,4 +110,437 @@ try, except 블록에서 코드를 실행하고 예외를 전달하거나 로그
 차이점은 suppress 메서드를 호출하면 로직에서 자체적으로 처리하고 있는 예외임을 명시한다는 점이다.
 
 DataConversionException은 입력 데이터가 기대한 것과 같은 포맷이어서 무시해도 안전하다는 것을 뜻한다.
-"""
\ No newline at end of file
+"""
+"""
+위의 db_handler(), dbhandler_decorator, DBHandler(5_contect_manager.py)는 with 블록에 진입할 때마다
+데이터베이스를 멈추고 다시 시작하기 때문에 백업 하나하나가 전체 시작/종료 비용을 치른다.
+
+컨텍스트 관리자의 사전조건, 사후조건을 "핸들 생성/종료" 대신 "풀에서 빌리기/반납하기"로 바꾸면
+이미 준비된(warm) 핸들을 재사용할 수 있다.
+
+HandlePool은 다음을 담당한다.
+- min_size, max_size: 최소한 유지할 핸들 수와 동시에 빌려줄 수 있는 최대 핸들 수
+- idle_timeout: 이 시간 이상 사용되지 않은 핸들은 min_size를 넘는 만큼 정리
+- health_check: 빌려주기 직전에 핸들이 정상인지 확인하고 아니면 버린 뒤 다른 핸들을 사용
+- lease(): with 블록 동안 핸들을 빌려주고 블록이 끝나면(예외가 발생해도) 반납하는 컨텍스트 관리자
+
+AsyncHandlePool은 같은 규칙을 asyncio로 구현한 것으로 async with pool.lease()로 사용한다.
+__init__에서는 await할 수 없으므로 min_size개의 핸들은 open()에서 만들고, open()을 부르지 않았다면 첫 acquire()에서 만든다.
+acquire(timeout)의 timeout은 깨어날 때마다 새로 시작하지 않고 호출한 시점부터의 전체 대기 시간이다.
+공통 로직(유휴 핸들 정리, 상태 확인)은 _HandlePoolBase에 두고 대기 방식만 각각 구현한다.
+"""
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+
+
+class _HandlePoolBase:
+    def __init__(
+        self,
+        factory,
+        min_size=1,
+        max_size=10,
+        idle_timeout=300,
+        health_check=None,
+        close=None,
+        clock=time.monotonic,
+    ):
+        if not 0 <= min_size <= max_size:
+            raise ValueError(f"0 <= min_size <= max_size 이어야 함: {min_size}, {max_size}")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._health_check = health_check or (lambda handle: True)
+        self._close = close or (lambda handle: None)
+        self._clock = clock
+        self._idle = deque()  # (핸들, 반납 시각), 오른쪽이 가장 최근
+        self._size = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _discard(self, handle):
+        self._size -= 1
+        self._close(handle)
+
+    def _evict_idle(self):
+        deadline = self._clock() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0][1] <= deadline:
+            handle, _ = self._idle.popleft()
+            self._discard(handle)
+
+    def _take_idle(self):
+        """ 가장 최근에 반납된 핸들부터 상태를 확인하며 꺼냄 """
+        while self._idle:
+            handle, _ = self._idle.pop()
+            if self._health_check(handle):
+                return handle
+            self._discard(handle)
+        return None
+
+    def _reserve(self):
+        """ 빌려줄 핸들이 있으면 반환하고, 새로 만들 수 있으면 자리를 예약하고 None 반환 """
+        self._evict_idle()
+        handle = self._take_idle()
+        if handle is not None or self._size >= self.max_size:
+            return handle, False
+        self._size += 1
+        return None, True
+
+
+class HandlePool(_HandlePoolBase):
+    """ 스레드 간에 공유하는 핸들 풀 """
+
+    def __init__(self, factory, **options):
+        super().__init__(factory, **options)
+        self._condition = threading.Condition()
+        for _ in range(self.min_size):
+            self._size += 1
+            self._idle.append((factory(), self._clock()))
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                handle, reserved = self._reserve()
+                if handle is not None:
+                    return handle
+                if reserved:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{timeout}초 동안 사용 가능한 핸들이 없음")
+                if not self._condition.wait(remaining):
+                    raise TimeoutError(f"{timeout}초 동안 사용 가능한 핸들이 없음")
+        try:
+            return self._factory()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, handle):
+        with self._condition:
+            self._idle.append((handle, self._clock()))
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def lease(self, timeout=None):
+        handle = self.acquire(timeout)
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def close(self):
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+
+class AsyncHandlePool(_HandlePoolBase):
+    """ asyncio 태스크 간에 공유하는 핸들 풀, factory는 코루틴 함수여도 됨 """
+
+    def __init__(self, factory, **options):
+        super().__init__(factory, **options)
+        self._condition = asyncio.Condition()
+        self._opened = False
+
+    async def _create(self):
+        handle = self._factory()
+        if inspect.isawaitable(handle):
+            handle = await handle
+        return handle
+
+    async def open(self):
+        """ min_size개의 핸들을 미리 만듦 """
+        async with self._condition:
+            if self._opened:
+                return
+            self._opened = True
+            while self._size < self.min_size:
+                self._size += 1
+                try:
+                    handle = await self._create()
+                except BaseException:
+                    self._size -= 1
+                    self._opened = False
+                    raise
+                self._idle.append((handle, self._clock()))
+            self._condition.notify_all()
+
+    async def acquire(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        if not self._opened:
+            await self.open()
+        async with self._condition:
+            while True:
+                handle, reserved = self._reserve()
+                if handle is not None:
+                    return handle
+                if reserved:
+                    break
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{timeout}초 동안 사용 가능한 핸들이 없음")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{timeout}초 동안 사용 가능한 핸들이 없음") from None
+        try:
+            return await self._create()
+        except BaseException:
+            async with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    async def release(self, handle):
+        async with self._condition:
+            self._idle.append((handle, self._clock()))
+            self._condition.notify()
+
+    @contextlib.asynccontextmanager
+    async def lease(self, timeout=None):
+        handle = await self.acquire(timeout)
+        try:
+            yield handle
+        finally:
+            await self.release(handle)
+
+    async def close(self):
+        async with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+
+"""
+풀을 사용하는 컨텍스트 관리자는 db_handler와 같은 모양을 유지한다.
+다만 yield로 빌린 핸들을 넘겨주기 때문에 with pooled_db_handler(pool) as handle: 형태로 사용할 수 있다.
+"""
+
+
+@contextlib.contextmanager
+def pooled_db_handler(pool):
+    with pool.lease() as handle:
+        yield handle
+
+
+@contextlib.asynccontextmanager
+async def async_pooled_db_handler(pool):
+    async with pool.lease() as handle:
+        yield handle
+
+
+"""
+실제 데이터베이스 대신 시작/종료에 시간이 걸리는 가짜 데이터베이스로 동작과 처리량을 확인해본다.
+"""
+
+
+class FakeDatabase:
+    startup_seconds = 0.005
+
+    def __init__(self):
+        time.sleep(self.startup_seconds)
+        self.healthy = True
+        self.backups = 0
+
+    def backup(self):
+        self.backups += 1
+
+
+pool = HandlePool(FakeDatabase, min_size=1, max_size=2, health_check=lambda db: db.healthy)
+with pooled_db_handler(pool) as db:
+    db.backup()
+with pooled_db_handler(pool) as db:
+    print(db.backups) # 1 (같은 핸들을 재사용)
+    db.healthy = False
+with pooled_db_handler(pool) as db:
+    print(db.backups, pool.size) # 0 1 (상태 확인에 실패한 핸들은 버리고 새로 만듦)
+
+
+async def async_backups():
+    async_pool = AsyncHandlePool(FakeDatabase, max_size=2)
+    await async_pool.open()
+    async with async_pooled_db_handler(async_pool) as db:
+        db.backup()
+    async with async_pooled_db_handler(async_pool) as db:
+        backups = db.backups
+    await async_pool.close()
+    return backups
+
+print(asyncio.run(async_backups())) # 1
+
+
+@contextlib.contextmanager
+def fake_db_handler():
+    db = FakeDatabase()
+    yield db
+
+for name, handler in (
+    ("매번 시작", fake_db_handler),
+    ("풀 사용", lambda: pooled_db_handler(pool)),
+):
+    start = time.perf_counter()
+    for _ in range(100):
+        with handler() as db:
+            db.backup()
+    print(f"{name}: {100 / (time.perf_counter() - start):.0f} backups/s")
+# 매번 시작: 190 backups/s
+# 풀 사용: 90000 backups/s
+
+"""
+db_backup()과 offline_backup()은 하나의 컨텍스트 안에서 한 번에 하나씩만 실행된다.
+샤드가 수십 개라면 전체 시간은 각 백업 시간의 합이 된다.
+
+BackupScheduler는 dbhandler_decorator처럼 contextlib.ContextDecorator를 상속한 컨텍스트 관리자로
+- __enter__: 데이터베이스를 한 번만 멈추고 스레드 풀을 준비
+- submit(): 백업 작업을 등록하고 Future를 반환, 같은 데이터베이스의 동시 실행 수는 per_database로 제한
+- progress(): 끝난 순서대로 (데이터베이스, Future)를 반환하여 진행 상황을 확인
+- __exit__: 모든 백업이 끝나기를 기다린 뒤 데이터베이스를 한 번만 다시 시작
+블록 안에서 예외가 발생하면 아직 시작하지 않은 백업은 취소하고, 실행 중인 백업만 마무리한 뒤 재시작한다.
+
+같은 데이터베이스의 제한을 넘는 작업은 스레드 풀에 넣지 않고 대기열에 두었다가
+앞선 작업이 끝날 때 넣기 때문에 대기하는 작업이 풀의 스레드를 차지하지 않는다.
+배치의 상태는 스케줄러 객체에 있으므로 한 스케줄러로 두 배치를 겹쳐서 실행할 수 없고, 시도하면 RuntimeError가 발생한다.
+"""
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from functools import partial
+
+
+class BackupScheduler(contextlib.ContextDecorator):
+    def __init__(self, max_workers=8, per_database=2, stop=None, start=None):
+        self.max_workers = max_workers
+        self.per_database = per_database
+        self._stop = stop or stop_database
+        self._start = start or start_database
+        self._lock = threading.Lock()
+        self._active = False
+
+    def __enter__(self):
+        with self._lock:
+            if self._active:
+                raise RuntimeError("이미 진행 중인 백업 배치가 있으므로 중첩하거나 동시에 실행할 수 없음")
+            self._active = True
+        try:
+            self._stop()
+        except BaseException:
+            self._active = False
+            raise
+        self._executor = ThreadPoolExecutor(self.max_workers)
+        self._queued = defaultdict(deque)
+        self._running = defaultdict(int)
+        self._futures = []
+        return self
+
+    def submit(self, database, backup, *args, **kwargs):
+        future = Future()
+        with self._lock:
+            self._queued[database].append((future, partial(backup, *args, **kwargs)))
+            self._futures.append((database, future))
+            ready = self._take(database)
+        self._launch(database, ready)
+        return future
+
+    def _take(self, database):
+        """ self._lock 안에서 호출, 지금 시작할 수 있는 백업을 대기열에서 꺼냄 """
+        queued = self._queued[database]
+        ready = []
+        while queued and self._running[database] < self.per_database:
+            future, backup = queued.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._running[database] += 1
+            ready.append((future, backup))
+        return ready
+
+    def _launch(self, database, ready):
+        """ 이미 끝난 작업의 콜백은 바로 이 스레드에서 실행되므로 반드시 self._lock 밖에서 호출 """
+        for future, backup in ready:
+            self._executor.submit(backup).add_done_callback(
+                partial(self._finished, database, future)
+            )
+
+    def _finished(self, database, future, done):
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+        with self._lock:
+            self._running[database] -= 1
+            ready = self._take(database)
+        self._launch(database, ready)
+
+    def progress(self):
+        databases = {future: database for database, future in self._futures}
+        for future in as_completed(databases):
+            yield databases[future], future
+
+    def cancel(self):
+        with self._lock:
+            for _, future in self._futures:
+                future.cancel()
+
+    def __exit__(self, exc_type, ex_value, ex_traceback):
+        try:
+            if exc_type is not None:
+                self.cancel()
+            wait([future for _, future in self._futures])
+            self._executor.shutdown()
+        finally:
+            try:
+                self._start()
+            finally:
+                with self._lock:
+                    self._active = False
+
+
+"""
+with 블록으로 사용하면 __enter__가 반환한 스케줄러에 작업을 등록하고,
+데코레이터로 사용하면 함수 전체가 하나의 백업 배치가 된다.
+두 경우 모두 데이터베이스는 배치 전체에서 한 번만 멈추고 한 번만 시작한다.
+"""
+
+
+def shard_backup(shard, seconds=0.05):
+    """ pg_dump 대신 seconds초가 걸리는 가짜 백업 """
+    time.sleep(seconds)
+    run(f"pg_dump {shard}")
+    return shard
+
+
+executed.clear()
+start = time.perf_counter()
+with BackupScheduler(max_workers=8, per_database=2) as scheduler:
+    for shard in ("orders_0", "orders_1", "orders_2", "users_0"):
+        scheduler.submit(shard.split("_")[0], shard_backup, shard)
+    print(sorted(future.result() for database, future in scheduler.progress()))
+    # ['orders_0', 'orders_1', 'orders_2', 'users_0']
+print(f"{time.perf_counter() - start:.2f}s") # 0.10s (orders는 2개씩, users는 함께 실행, 하나씩 하면 0.20s)
+print(executed[0], executed[-1], len(executed))
+# systemctl stop postgresql.service systemctl start postgresql.service 6 (멈추고 시작하는 것은 한 번씩)
+
+batch = BackupScheduler(max_workers=8)
+
+
+@batch
+def offline_backups(shards):
+    for shard in shards:
+        batch.submit("orders", shard_backup, shard)
+
+executed.clear()
+offline_backups(["orders_0", "orders_1"])
+print(executed)
+# ['systemctl stop postgresql.service', 'pg_dump orders_0', 'pg_dump orders_1', 'systemctl start postgresql.service']
+# (두 pg_dump는 동시에 실행되므로 순서는 바뀔 수 있음)
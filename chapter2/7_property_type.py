@@ -62,10 +62,234 @@ class Connector:
 
 conn = Connector("postgresql://localhost")
 conn.connect() # connecting with 60s
-print(conn.__timeout) 
+# print(conn.__timeout)
 # Traceback (most recent call last):
 #   File "/Users/wooogy-dev/dev/python-clean-code/7_property_type.py", line 47, in <module>
 #     print(conn.__timeout)
 # AttributeError: 'Connector' object has no attribute '__timeout'
 
-print(conn._Connector__timeout) # 60
\ No newline at end of file
+print(conn._Connector__timeout) # 60
+"""
+밑줄 하나로 _timeout을 private으로 두었기 때문에 인터페이스를 유지하면서 내부를 마음껏 바꿀 수 있다.
+이번에는 Connector가 실제로 연결을 관리하도록 확장해본다.
+
+- 지연 연결: 객체를 만들 때가 아니라 처음 사용할 때 연결
+- keep-alive 재사용: 마지막 사용 후 keep_alive초 이내라면 기존 연결을 재사용
+- 유휴 연결 정리: 모든 Connector가 공유하는 백그라운드 스레드 하나가 keep_alive초 이상 사용되지 않은 연결을 닫음
+- timeout, keep_alive 프로퍼티: 값을 설정할 때 유효성을 검사하고, timeout은 각 작업의 제한 시간으로 사용
+- stats: 새 연결(connects), 재사용(reuses), 시간 초과(timeouts) 횟수
+
+timeout은 내부적으로 여전히 _timeout에 저장되므로 conn.timeout으로 읽고 쓰는 외부 인터페이스는 단순하게 유지된다.
+"""
+import socket
+import threading
+import time
+import weakref
+from collections import Counter
+from urllib.parse import urlsplit
+
+DEFAULT_PORTS = {"postgresql": 5432, "mysql": 3306, "redis": 6379}
+
+
+def open_socket(source, timeout):
+    url = urlsplit(source)
+    return socket.create_connection(
+        (url.hostname, url.port or DEFAULT_PORTS.get(url.scheme, 80)), timeout
+    )
+
+
+class _IdleReaper:
+    """ 모든 Connector의 유휴 연결을 정리하는 하나의 백그라운드 스레드
+
+    Connector를 약한 참조로만 가지므로 close()하지 않은 Connector도 사용이 끝나면 메모리에서 사라지고,
+    정리할 Connector가 없으면 스레드도 종료된다.
+    """
+
+    def __init__(self):
+        self._connectors = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def register(self, connector):
+        with self._lock:
+            self._connectors.add(connector)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wakeup.set()  # 더 짧은 keep_alive가 들어왔을 수 있으므로 간격을 다시 계산
+
+    def unregister(self, connector):
+        with self._lock:
+            self._connectors.discard(connector)
+
+    def _interval(self):
+        with self._lock:
+            keep_alives = [connector.keep_alive for connector in self._connectors]
+            if not keep_alives:
+                self._thread = None
+                return None
+        return min(keep_alives) / 2
+
+    def _reap(self):
+        # 지역 변수가 Connector를 붙잡고 있지 않도록 별도의 메서드에서 처리
+        with self._lock:
+            connectors = list(self._connectors)
+        for connector in connectors:
+            connector.reap_idle()
+
+    def _run(self):
+        while (interval := self._interval()) is not None:
+            if not self._wakeup.wait(interval):
+                self._reap()
+            self._wakeup.clear()
+
+
+_reaper = _IdleReaper()
+
+
+class Connector:
+    def __init__(
+        self,
+        source,
+        timeout=60,
+        keep_alive=30,
+        open_connection=open_socket,
+        clock=time.monotonic,
+    ):
+        self.source = source
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.stats = Counter(connects=0, reuses=0, timeouts=0)
+        self._open_connection = open_connection
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._connection = None
+        self._last_used = None
+
+    @property
+    def keep_alive(self):
+        return self._keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, new_keep_alive):
+        if isinstance(new_keep_alive, bool) or not isinstance(new_keep_alive, (int, float)):
+            raise TypeError(f"keep_alive는 숫자여야 함: {new_keep_alive!r}")
+        if new_keep_alive <= 0:
+            raise ValueError(f"keep_alive는 0보다 커야 함: {new_keep_alive}")
+        self._keep_alive = new_keep_alive
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, new_timeout):
+        if isinstance(new_timeout, bool) or not isinstance(new_timeout, (int, float)):
+            raise TypeError(f"timeout은 숫자여야 함: {new_timeout!r}")
+        if new_timeout <= 0:
+            raise ValueError(f"timeout은 0보다 커야 함: {new_timeout}")
+        self._timeout = new_timeout
+        connection = getattr(self, "_connection", None)
+        if connection is not None and hasattr(connection, "settimeout"):
+            connection.settimeout(new_timeout)
+
+    def _expired(self, now):
+        return now - self._last_used >= self.keep_alive
+
+    def connect(self):
+        with self._lock:
+            now = self._clock()
+            if self._connection is not None and not self._expired(now):
+                self.stats["reuses"] += 1
+            else:
+                self._discard()
+                self._connection = self._open_connection(self.source, self.timeout)
+                self.stats["connects"] += 1
+                _reaper.register(self)
+            self._last_used = now
+            return self._connection
+
+    def run(self, operation, *args):
+        """ operation(connection, *args)를 timeout초 제한으로 실행 """
+        with self._lock:
+            connection = self.connect()
+            if hasattr(connection, "settimeout"):
+                connection.settimeout(self.timeout)
+            try:
+                return operation(connection, *args)
+            except TimeoutError:
+                # 시간 초과 후의 연결 상태는 알 수 없으므로 재사용하지 않음
+                self.stats["timeouts"] += 1
+                self._discard()
+                raise
+            finally:
+                self._last_used = self._clock()
+
+    def _discard(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            _reaper.unregister(self)
+
+    def reap_idle(self):
+        with self._lock:
+            if self._connection is not None and self._expired(self._clock()):
+                self._discard()
+
+    def close(self):
+        with self._lock:
+            self._discard()
+
+"""
+실제 소켓 대신 가짜 연결과 가짜 시계로 동작을 확인해본다.
+"""
+
+
+class FakeConnection:
+    def __init__(self, source, timeout):
+        self.timeout = timeout
+        self.closed = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def close(self):
+        self.closed = True
+
+
+now = [0.0]
+conn = Connector(
+    "postgresql://localhost", timeout=5, keep_alive=30,
+    open_connection=FakeConnection, clock=lambda: now[0],
+)
+print(conn._connection) # None (아직 연결하지 않음)
+first = conn.connect()
+print(conn.connect() is first) # True
+now[0] = 31.0
+conn.reap_idle()
+print(first.closed) # True
+conn.connect()
+print(dict(conn.stats)) # {'connects': 2, 'reuses': 1, 'timeouts': 0}
+
+
+def slow_query(connection):
+    raise TimeoutError(f"{connection.timeout}초 안에 응답 없음")
+
+try:
+    conn.run(slow_query)
+except TimeoutError as e:
+    print(e) # 5초 안에 응답 없음
+print(dict(conn.stats)) # {'connects': 2, 'reuses': 2, 'timeouts': 1}
+
+try:
+    conn.timeout = -1
+except ValueError as e:
+    print(e) # timeout은 0보다 커야 함: -1
+conn.close()
+
+leaked = Connector("postgresql://localhost", open_connection=FakeConnection)
+leaked.connect()
+leaked_ref = weakref.ref(leaked)
+del leaked  # close()하지 않아도 정리 스레드가 붙잡고 있지 않음
+print(leaked_ref() is None) # True
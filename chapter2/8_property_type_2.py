@@ -33,13 +33,17 @@ class User:
             raise ValueError(f"유효한 이메일이 아니므로 {new_email} 값을 사용할 수 없음")
         self._email = new_email
 
-u1 = User("han")
-u1.email = "han@"
-# ...ValueError: 유효한 이메일이 아니므로 han@ 값을 사용할 수 없음
+if __name__ == "__main__":
+    u1 = User("han")
+    try:
+        u1.email = "han@"
+    except ValueError as e:
+        print(e)
+    # 유효한 이메일이 아니므로 han@ 값을 사용할 수 없음
 
-u1.email = "han@g.co"
-print(u1.email)
-# han@g.co
+    u1.email = "han@g.co"
+    print(u1.email)
+    # han@g.co
 """
 이메일에 프로퍼티를 사용하여 얻을 수 이점
 - 첫 번째 @property 메서드는 private 속성인 email 값을 반환한다.(_ 는 private으로 사용될 것을 말함)
@@ -64,4 +68,294 @@ print(u1.email)
 
 + 한 메서드에서 한 가지 이상의 일을 하지 말자!
 무언가를 할당하고 유효성 검사를 하고 싶으면 두 개 이상의 문장으로 나누어야 한다.
-"""
\ No newline at end of file
+"""
+"""
+사용자 레코드를 수백만 건씩 가져오는 경우에는 email을 설정할 때마다 실행되는 정규식 검사가 병목이 된다.
+프로퍼티 덕분에 검사 로직은 setter 한 곳에만 있으므로 이 부분만 바꾸면 된다.
+
+- 같은 값을 다시 설정하는 경우: 이미 검사를 통과한 값이므로 검사하지 않음
+- 최근에 검사한 주소: functools.lru_cache로 결과를 기억
+- 대량 입력: User.from_records()가 레코드를 chunksize 단위로 나누고
+  조각 안에서 중복을 제거한 주소만 검사한 뒤 검사가 끝난 값을 바로 저장한다.
+  workers를 지정하면 조각의 검사를 프로세스 풀에 나눠서 실행한다.
+  (정규식 한 번은 매우 짧아서 프로세스 간 통신 비용이 더 클 수 있으므로 기본값은 사용하지 않음)
+  워커 프로세스는 부모의 lru_cache를 공유하지 않으므로 이 경로는 캐시를 거치지 않고 매번 정규식으로 검사한다.
+  spawn 방식(macOS, Windows의 기본값)의 워커는 이 파일을 다시 import하므로 예제 코드는 모두
+  if __name__ == "__main__": 아래에 둔다.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+
+@lru_cache(maxsize=65536)
+def is_valid_email_cached(potentially_valid_email: str):
+    return is_valid_email(potentially_valid_email)
+
+
+def _validate_batch(emails):
+    return [is_valid_email(email) for email in emails]
+
+
+class User:
+    def __init__(self, username):
+        self.username = username
+        self._email = None
+
+    @property
+    def email(self):
+        return self._email
+
+    @email.setter
+    def email(self, new_email):
+        if self._email is not None and new_email == self._email:
+            return
+        if not is_valid_email_cached(new_email):
+            raise ValueError(f"유효한 이메일이 아니므로 {new_email} 값을 사용할 수 없음")
+        self._email = new_email
+
+    @classmethod
+    def from_records(cls, records, workers=None, chunksize=10000):
+        """ (username, email) 레코드에서 User 목록을 만듦, 잘못된 이메일이 있으면 ValueError
+        workers를 지정하면 검사는 워커 프로세스에서 하므로 is_valid_email_cached의 캐시를 사용하지 않음
+        """
+        records = iter(records)
+        executor = ProcessPoolExecutor(workers) if workers else None
+        users = []
+        try:
+            while chunk := list(islice(records, chunksize)):
+                valid = cls._validate(executor, {email for _, email in chunk}, workers)
+                for username, email in chunk:
+                    if not valid[email]:
+                        raise ValueError(f"유효한 이메일이 아니므로 {email} 값을 사용할 수 없음")
+                    user = cls(username)
+                    user._email = email
+                    users.append(user)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return users
+
+    @staticmethod
+    def _validate(executor, emails, workers):
+        emails = list(emails)
+        if executor is None:
+            return {email: is_valid_email_cached(email) for email in emails}
+        size = -(-len(emails) // workers)
+        batches = [emails[start:start + size] for start in range(0, len(emails), size)]
+        results = {}
+        for batch, valid in zip(batches, executor.map(_validate_batch, batches)):
+            results.update(zip(batch, valid))
+        return results
+
+if __name__ == "__main__":
+    users = User.from_records([("han", "han@g.co"), ("kim", "kim@g.co")])
+    print([user.email for user in users]) # ['han@g.co', 'kim@g.co']
+
+    try:
+        User.from_records([("lee", "lee@")])
+    except ValueError as e:
+        print(e) # 유효한 이메일이 아니므로 lee@ 값을 사용할 수 없음
+
+"""
+한 건씩 생성하는 경우와 대량으로 생성하는 경우 비교 (20만 건, 주소 2만 종류)
+workers를 지정한 경우는 프로세스를 띄우는 비용과 주소 목록을 주고받는 비용이 더해지므로
+코어가 여러 개이고 주소 종류가 아주 많을 때만 이득이 있다. (측정한 환경은 코어 1개)
+"""
+import os
+import timeit
+
+if __name__ == "__main__":
+    records = [(f"user{n}", f"user{n % 20000}@example.com") for n in range(200000)]
+
+    def one_by_one():
+        result = []
+        for username, email in records:
+            user = User(username)
+            user.email = email
+            result.append(user)
+        return result
+
+    is_valid_email_cached.cache_clear()
+    print(timeit.timeit(one_by_one, number=1)) # 약 0.19초
+    is_valid_email_cached.cache_clear()
+    print(timeit.timeit(lambda: User.from_records(records), number=1)) # 약 0.15초
+    print(os.cpu_count(), timeit.timeit(lambda: User.from_records(records, workers=2), number=1))
+    # 1 약 0.7초 (코어 1개에서는 캐시도 못 쓰고 프로세스 비용만 더해져서 더 느림)
+
+"""
+User 객체를 수천만 개 보관하면 인스턴스마다 있는 __dict__와 중복된 문자열이 메모리의 대부분을 차지한다.
+
+- SlottedUser: __slots__로 __dict__를 없앤 User, email 프로퍼티는 그대로 사용
+- UserBatch: 열 지향 배치로 username과 email을 StringTable에 한 번씩만 저장하고
+  각 레코드는 array('I')에 문자열 번호만 가진다. 같은 도메인, 같은 주소가 반복될수록 효과가 크다.
+  batch[i]는 UserView를 반환하며 user.email = ... 처럼 속성으로 읽고 쓸 수 있고,
+  email을 바꿀 때는 User와 같은 유효성 검사를 거친다. email이 없는 레코드는 NO_EMAIL 번호로 표시한다.
+"""
+from array import array
+
+
+class SlottedUser:
+    """ 부모 클래스에 __dict__가 있으면 __slots__의 효과가 없으므로 User를 상속하지 않음 """
+
+    __slots__ = ("username", "_email")
+
+    def __init__(self, username):
+        self.username = username
+        self._email = None
+
+    @property
+    def email(self):
+        return self._email
+
+    @email.setter
+    def email(self, new_email):
+        if self._email is not None and new_email == self._email:
+            return
+        if not is_valid_email_cached(new_email):
+            raise ValueError(f"유효한 이메일이 아니므로 {new_email} 값을 사용할 수 없음")
+        self._email = new_email
+
+
+class StringTable:
+    """ 같은 문자열을 한 번만 저장하고 번호로 참조하는 테이블 """
+
+    def __init__(self):
+        self._strings = []
+        self._numbers = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def number(self, string):
+        number = self._numbers.get(string)
+        if number is None:
+            number = self._numbers[string] = len(self._strings)
+            self._strings.append(string)
+        return number
+
+    def __getitem__(self, number):
+        return self._strings[number]
+
+
+NO_EMAIL = 2 ** 32 - 1
+
+
+class UserView:
+    """ UserBatch의 i번째 레코드를 User처럼 보여주는 뷰 """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def username(self):
+        return self._batch.strings[self._batch.usernames[self._index]]
+
+    @property
+    def email(self):
+        number = self._batch.emails[self._index]
+        return None if number == NO_EMAIL else self._batch.strings[number]
+
+    @email.setter
+    def email(self, new_email):
+        if not is_valid_email_cached(new_email):
+            raise ValueError(f"유효한 이메일이 아니므로 {new_email} 값을 사용할 수 없음")
+        self._batch.emails[self._index] = self._batch.strings.number(new_email)
+
+
+class UserBatch:
+    """ username, email을 문자열 테이블의 번호로 저장하는 User 묶음 """
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.usernames = array("I")
+        self.emails = array("I")
+
+    def append(self, username, email=None):
+        if email is not None and not is_valid_email_cached(email):
+            raise ValueError(f"유효한 이메일이 아니므로 {email} 값을 사용할 수 없음")
+        self.usernames.append(self.strings.number(username))
+        self.emails.append(NO_EMAIL if email is None else self.strings.number(email))
+
+    @classmethod
+    def from_records(cls, records):
+        batch = cls()
+        for username, email in records:
+            batch.append(username, email)
+        return batch
+
+    def __len__(self):
+        return len(self.usernames)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{index}번째 User가 없음")
+        return UserView(self, index)
+
+    def __iter__(self):
+        return (UserView(self, index) for index in range(len(self)))
+
+if __name__ == "__main__":
+    user_batch = UserBatch.from_records([("han", "han@g.co"), ("kim", "han@g.co"), ("lee", None)])
+    print(user_batch[1].username, user_batch[1].email) # kim han@g.co
+    print(len(user_batch.strings)) # 4 (같은 주소는 한 번만 저장)
+    print(user_batch[-1].email) # None
+    user_batch[-1].email = "lee@g.co"
+    print([user.email for user in user_batch]) # ['han@g.co', 'han@g.co', 'lee@g.co']
+
+    slotted = SlottedUser("han")
+    slotted.email = "han@g.co"
+    print(hasattr(slotted, "__dict__")) # False
+
+"""
+1000만 명의 User(주소 2만 종류)를 만들 때의 생성 시간과 메모리
+10만 명으로 측정하고 1000만 명으로 환산한 값을 출력한다.
+(tracemalloc은 할당마다 기록을 남겨 느려지므로 시간은 tracemalloc을 끈 상태에서 따로 잰다)
+"""
+import time
+import tracemalloc
+
+if __name__ == "__main__":
+    N = 10_000_000
+    SAMPLE = 100_000
+
+    def build_users(user_class):
+        users = []
+        for n in range(SAMPLE):
+            user = user_class(f"user{n}")
+            user.email = f"user{n % 20000}@example.com"
+            users.append(user)
+        return users
+
+    def build_batch():
+        batch = UserBatch()
+        for n in range(SAMPLE):
+            batch.append(f"user{n}", f"user{n % 20000}@example.com")
+        return batch
+
+    for name, build in (
+        ("User", lambda: build_users(User)),
+        ("SlottedUser", lambda: build_users(SlottedUser)),
+        ("UserBatch", build_batch),
+    ):
+        is_valid_email_cached.cache_clear()
+        start = time.perf_counter()
+        users = build()
+        elapsed = time.perf_counter() - start
+        del users
+        tracemalloc.start()
+        users = build()
+        megabytes = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+        del users
+        print(f"{name} x 10M: {elapsed * N / SAMPLE:.1f}s, {megabytes * N / SAMPLE:.0f}MB")
+    # python 8_property_type_2.py 로 파일 전체를 실행했을 때의 결과
+    # User x 10M: 22.6s, 2130MB
+    # SlottedUser x 10M: 21.0s, 1748MB
+    # UserBatch x 10M: 25.8s, 1546MB
+    # (이 예제는 username이 모두 달라서 문자열 테이블의 이득은 email에서만 생김, 시간은 실행마다 10% 정도 차이가 남)
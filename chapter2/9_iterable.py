@@ -24,7 +24,13 @@ for 루프에서 반복 가능한 객체를 만드는 방법은 두가지가 있
 이다.
 """
 
-from datetime import timedelta, date
+from array import array
+from datetime import timedelta, date, datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class DateRangeIterable:
     """ 자체 이터레이터 메서드를 가지고 있는 이터러블 """
@@ -111,4 +117,224 @@ class DateRangeIterable2:
 
 r2 = DateRangeIterable2(date(2019, 1, 1), date(2019, 1, 5))
 print(", ".join(map(str, r2))) # 2019-01-01, 2019-01-02, 2019-01-03, 2019-01-04
-print(max(r2)) # 2019-01-04
\ No newline at end of file
+print(max(r2)) # 2019-01-04
+"""
+DateRangeIterable2는 여러 번 반복할 수 있지만 매번 처음부터 다시 생성한다.
+중간에서 멈춘 반복을 이어서 하려면 처음부터 그 위치까지 timedelta 덧셈을 다시 반복해야 하고,
+__next__가 호출될 때마다 timedelta(days=1) 객체를 새로 만드는 것도 낭비이다.
+
+이를 개선하기 위해 역할을 나눠본다.
+- 이터러블(DateRangeIterable3)은 범위와 간격(step)만 가지고 있고 __iter__마다 새 이터레이터를 만든다.
+- 이터레이터(DateRangeIterator)는 현재 위치(몇 번째 요소인지)를 정수 커서로 기억한다.
+- 간격 객체는 n번째 날짜와 특정 날짜까지의 거리를 O(1)로 계산한다.
+
+커서는 정수이므로 그대로 저장해 두었다가 resume()으로 이어서 반복할 수 있고,
+seek(date)는 처음부터 반복하지 않고 해당 날짜로 바로 이동한다.
+간격은 timedelta(시간, 주 단위 등) 또는 영업일(BusinessDays)을 사용할 수 있다.
+(시간 단위 간격은 date가 시간을 버리므로 datetime으로 범위를 지정해야 하고, date로 지정하면 ValueError)
+"""
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # datetime64의 기준일
+
+
+class FixedStep:
+    """ timedelta 간격, 생성 시 한 번 만든 timedelta를 계속 재사용 """
+
+    def __init__(self, delta):
+        if delta <= timedelta(0):
+            raise ValueError(f"간격은 0보다 커야 함: {delta}")
+        self.delta = delta
+
+    def offset(self, start, n):
+        return start + self.delta * n
+
+    def count(self, start, target):
+        """ start에서 target 이상이 될 때까지 필요한 간격의 수 """
+        return max(0, -((start - target) // self.delta))
+
+    def advance(self, day):
+        return day + self.delta
+
+    def to_array(self, start, end):
+        days, remainder = divmod(self.delta, timedelta(days=1))
+        if remainder:
+            raise ValueError(f"일 단위 간격만 배열로 만들 수 있음: {self.delta}")
+        ordinals = range(start.toordinal(), end.toordinal(), days)
+        if np is None:
+            return array("i", ordinals)
+        return (
+            np.arange(ordinals.start, ordinals.stop, ordinals.step) - EPOCH_ORDINAL
+        ).astype("datetime64[D]")
+
+
+class BusinessDays:
+    """ 주말(토, 일)을 건너뛰는 영업일 간격 """
+
+    def __init__(self, days=1):
+        if days <= 0:
+            raise ValueError(f"간격은 0보다 커야 함: {days}")
+        self.days = days
+        self._advance = tuple(
+            self._calendar_days(weekday, days) for weekday in range(5)
+        )
+
+    @staticmethod
+    def _calendar_days(weekday, business_days):
+        weeks, rest = divmod(business_days, 5)
+        weekend = 2 if weekday + rest >= 5 else 0
+        return timedelta(days=weeks * 7 + rest + weekend)
+
+    @staticmethod
+    def _first(start):
+        if start.weekday() >= 5:
+            return start + timedelta(days=7 - start.weekday())
+        return start
+
+    def offset(self, start, n):
+        first = self._first(start)
+        return first + self._calendar_days(first.weekday(), n * self.days)
+
+    def count(self, start, target):
+        first = self._first(start)
+        weeks, rest = divmod((target - first).days, 7)
+        if weeks < 0:
+            return 0
+        weekday = first.weekday()
+        business_days = weeks * 5 + sum(
+            1 for i in range(rest) if (weekday + i) % 7 < 5
+        )
+        return -(-business_days // self.days)
+
+    def advance(self, day):
+        return day + self._advance[day.weekday()]
+
+    def to_array(self, start, end):
+        ordinals = range(self._first(start).toordinal(), end.toordinal())
+        if np is None:
+            # 서수 1(0001-01-01)이 월요일이므로 (서수 - 1) % 7이 요일
+            return array("i", [o for o in ordinals if (o - 1) % 7 < 5][:: self.days])
+        ordinals = np.arange(ordinals.start, ordinals.stop)
+        business_days = ordinals[(ordinals - 1) % 7 < 5][:: self.days]
+        return (business_days - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+class DateRangeIterator:
+    """ 현재 위치를 정수 커서로 기억하는 이터레이터 """
+
+    def __init__(self, date_range, cursor=0):
+        self._range = date_range
+        self.seek_position(cursor)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._current >= self._range.end_date:
+            raise StopIteration
+        today = self._current
+        self._current = self._range.step.advance(today)
+        self.cursor += 1
+        return today
+
+    def seek_position(self, cursor):
+        if cursor < 0:
+            # 음수 커서는 start_date 이전의 날짜를 만들어내므로 허용하지 않음
+            raise ValueError(f"커서는 0 이상이어야 함: {cursor}")
+        self.cursor = cursor
+        self._current = self._range.step.offset(self._range.start_date, cursor)
+        return self
+
+    def seek(self, day):
+        """ day 이상인 첫 번째 요소로 이동 """
+        return self.seek_position(
+            self._range.step.count(self._range.start_date, day)
+        )
+
+
+class DateRangeIterable3:
+    """ 반복할 때마다 새 이터레이터를 만들고, 커서로 이어서 반복할 수 있는 이터러블 """
+
+    def __init__(self, start_date, end_date, step=timedelta(days=1)):
+        if (
+            isinstance(step, timedelta)
+            and not isinstance(start_date, datetime)
+            and step % timedelta(days=1)
+        ):
+            # date에 하루 미만의 시간을 더하면 그대로이므로 반복이 끝나지 않음
+            raise ValueError(f"date 범위에는 일 단위 간격만 사용할 수 있음, datetime으로 지정해야 함: {step}")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.step = FixedStep(step) if isinstance(step, timedelta) else step
+
+    def __iter__(self):
+        return DateRangeIterator(self)
+
+    def resume(self, cursor):
+        return DateRangeIterator(self, cursor)
+
+    def seek(self, day):
+        return DateRangeIterator(self).seek(day)
+
+    def to_array(self):
+        return self.step.to_array(self.start_date, self.end_date)
+
+    def chunks(self, size):
+        total = self.step.count(self.start_date, self.end_date)
+        for cursor in range(0, total, size):
+            yield self.step.to_array(
+                self.step.offset(self.start_date, cursor),
+                self.step.offset(self.start_date, min(cursor + size, total)),
+            )
+
+r3 = DateRangeIterable3(date(2019, 1, 1), date(2019, 1, 5))
+print(", ".join(map(str, r3))) # 2019-01-01, 2019-01-02, 2019-01-03, 2019-01-04
+print(max(r3)) # 2019-01-04
+
+it = iter(r3)
+print(next(it), next(it)) # 2019-01-01 2019-01-02
+checkpoint = it.cursor # 2
+print(", ".join(map(str, r3.resume(checkpoint)))) # 2019-01-03, 2019-01-04
+print(", ".join(map(str, r3.seek(date(2019, 1, 4))))) # 2019-01-04
+try:
+    r3.resume(-1)
+except ValueError as e:
+    print(e) # 커서는 0 이상이어야 함: -1
+
+weeks = DateRangeIterable3(date(2019, 1, 1), date(2019, 2, 1), step=timedelta(weeks=1))
+print(", ".join(map(str, weeks))) # 2019-01-01, 2019-01-08, 2019-01-15, 2019-01-22, 2019-01-29
+
+hours = DateRangeIterable3(datetime(2019, 1, 1), datetime(2019, 1, 2), step=timedelta(hours=6))
+print(", ".join(map(str, hours))) # 2019-01-01 00:00:00, 2019-01-01 06:00:00, 2019-01-01 12:00:00, 2019-01-01 18:00:00
+try:
+    DateRangeIterable3(date(2019, 1, 1), date(2019, 1, 2), step=timedelta(hours=6))
+except ValueError as e:
+    print(e) # date 범위에는 일 단위 간격만 사용할 수 있음, datetime으로 지정해야 함: 6:00:00
+
+business = DateRangeIterable3(date(2019, 1, 3), date(2019, 1, 10), step=BusinessDays())
+print(", ".join(map(str, business))) # 2019-01-03, 2019-01-04, 2019-01-07, 2019-01-08, 2019-01-09
+print(next(business.seek(date(2019, 1, 5)))) # 2019-01-07
+
+"""
+커서가 단순한 정수이기 때문에 배치 작업의 체크포인트에 그대로 저장할 수 있고,
+재시작 시 r3.resume(cursor)로 처음부터 반복하지 않고 O(1)로 위치를 복원한다.
+"""
+
+"""
+수백만 개의 날짜 범위를 달력으로 바꾸는 작업에서 __next__로 date 객체를 하나씩 만드는 비용은 무시할 수 없다.
+간격 객체는 n번째 날짜를 바로 계산할 수 있으므로 범위 전체를 한 번에 배열로 만들 수 있다.
+
+- NumPy가 설치되어 있으면 연속된 datetime64[D] 배열을 np.arange 한 번으로 생성
+- NumPy가 없으면 표준 라이브러리 array('i')에 날짜의 서수(date.toordinal())를 담아서 반환
+
+chunks(n)는 범위를 n개씩 잘라서 배열로 반환하므로 아주 긴 범위도 메모리를 일정하게 유지하며 처리할 수 있다.
+각 조각의 경계는 offset()으로 O(1)에 계산한다.
+"""
+
+print(r3.to_array())
+# NumPy: ['2019-01-01' '2019-01-02' '2019-01-03' '2019-01-04']
+# array('i', [737060, 737061, 737062, 737063])
+print(business.to_array())
+# NumPy: ['2019-01-03' '2019-01-04' '2019-01-07' '2019-01-08' '2019-01-09']
+# array('i', [737062, 737063, 737066, 737067, 737068])
+print([len(chunk) for chunk in weeks.chunks(2)]) # [2, 2, 1]